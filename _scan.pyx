@@ -0,0 +1,24 @@
+# cython: language_level=3, boundscheck=False, wraparound=False
+"""Compiled counterpart of scan.partition_entries; see scan.py for the contract."""
+
+cpdef tuple partition_entries(list entries, dict progress, dict local_index):
+    cdef list pending = []
+    cdef list intact = []
+    cdef list suspect = []
+    cdef tuple entry
+    cdef object record
+    cdef object local_size
+
+    for entry in entries:
+        record = progress.get(entry[0])
+        if record is None or not record.get("completed", False):
+            pending.append(entry)
+            continue
+
+        local_size = local_index.get(entry[1])
+        if local_size is not None and local_size == entry[2]:
+            intact.append(entry)
+        else:
+            suspect.append(entry)
+
+    return pending, intact, suspect
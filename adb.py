@@ -1,24 +1,114 @@
+import os
+import posixpath
+import shlex
+import shutil
 import subprocess
+import threading
 import logging
-from typing import List, Optional
+from typing import Dict, Iterator, List, Optional, Tuple
+
+try:
+    from adb_shell.adb_device import AdbDeviceUsb
+    from adb_shell.auth.sign_pythonrsa import PythonRSASigner
+except ImportError:
+    AdbDeviceUsb = None
+    PythonRSASigner = None
 
 logger = logging.getLogger("adb_backup")
 
+# Conservative cap on a single device shell command line, well under adb's protocol limit
+MAX_SHELL_COMMAND = 4000
+
+# Python's fds are non-inheritable by default, so skipping the close-all-fds step is safe,
+# and on POSIX it lets subprocess launch adb through posix_spawn instead of fork + exec
+SPAWN_OPTIONS = {} if os.name == 'nt' else {'close_fds': False}
+
+# Printed after find exits; listing lines always contain a tab, so this can't collide with one
+LISTING_TRAILER = "--listing-complete--"
+
+# Device-side framing for pull_batch: each file is preceded by its size as a fixed
+# 10-digit header line, or -1 when it can't be stat'ed. Exactly that many bytes always
+# follow, zero-padded if the read falls short, then a 3-digit status line: head's exit
+# code, or 1 if the file changed size while it was read. Only status 0 means intact.
+BATCH_SCRIPT = (
+    'exec 4>&1; for f in {paths}; do '
+    's=$(stat -c %s "$f" 2>/dev/null) || s=-1; '
+    'printf "%010d\\n" "$s"; '
+    '[ "$s" -ge 0 ] || continue; '
+    'r=$({{ {{ head -c "$s" "$f" 2>/dev/null; echo $? >&3; cat /dev/zero 3>&-; }} | head -c "$s" >&4; }} 3>&1); '
+    '[ "$r" = 0 ] && [ "$(stat -c %s "$f" 2>/dev/null)" != "$s" ] && r=1; '
+    'printf "%03d\\n" "${{r:-255}}"; '
+    'done'
+)
+BATCH_HEADER_SIZE = 11
+BATCH_STATUS_SIZE = 4
+
+# pull_batch copies payloads through a fixed per-thread buffer of this size
+BATCH_BUFFER_SIZE = 1 << 20
+
+_batch_buffers = threading.local()
+
+def _batch_buffer() -> memoryview:
+    """The calling thread's scratch buffer for pull_batch payloads, allocated on first use."""
+    buffer = getattr(_batch_buffers, 'buffer', None)
+    if buffer is None:
+        buffer = _batch_buffers.buffer = memoryview(bytearray(BATCH_BUFFER_SIZE))
+    return buffer
+
+def _discard(path: str) -> None:
+    try: os.remove(path)
+    except OSError: pass
+
+def _chunk_arguments(arguments: List[str], budget: int = MAX_SHELL_COMMAND) -> List[List[str]]:
+    """Group pre-quoted shell arguments into runs that each fit within one command line."""
+    chunks: List[List[str]] = []
+    length = budget
+    for argument in arguments:
+        if length + len(argument) + 1 > budget:
+            chunks.append([])
+            length = 0
+        chunks[-1].append(argument)
+        length += len(argument) + 1
+    return chunks
+
 class ADBClient:
     """Handles all communication with the Android Debug Bridge (ADB)."""
     
-    def __init__(self, short_timeout: int = 5, medium_timeout: int = 60, long_timeout: int = 300):
+    # Whether stream_tar can deliver a binary archive of a device directory
+    supports_tar_stream = True
+    
+    def __init__(self, short_timeout: int = 5, medium_timeout: int = 60, long_timeout: int = 300,
+                 executable: Optional[str] = None):
         self.short_timeout = short_timeout
         self.medium_timeout = medium_timeout
         self.long_timeout = long_timeout
+        # Resolve adb once; an absolute path skips the PATH search on every spawn
+        # and is a precondition for subprocess's posix_spawn fast path
+        self.executable = executable or shutil.which('adb') or 'adb'
 
     def _run(self, cmd: List[str], timeout: int) -> subprocess.CompletedProcess:
-        return subprocess.run(cmd, capture_output=True, text=True, encoding='utf-8', timeout=timeout)
+        return subprocess.run(cmd, capture_output=True, text=True, encoding='utf-8', timeout=timeout,
+                              **SPAWN_OPTIONS)
+
+    def _shell(self, command: str, timeout: int) -> subprocess.CompletedProcess:
+        return self._run([self.executable, 'shell', command], timeout=timeout)
+
+    def start_server(self) -> bool:
+        """Ensure the adb server is running so later client invocations only have to connect to it."""
+        try:
+            result = self._run([self.executable, 'start-server'], timeout=self.medium_timeout)
+            if result.returncode != 0:
+                logger.error(f"Failed to start ADB server: {result.stderr}")
+                return False
+            return True
+        except Exception as e:
+            logger.error(f"Error starting ADB server: {e}")
+            return False
 
     def is_connected(self) -> bool:
         """Check if an ADB device is successfully connected."""
         try:
-            result = self._run(['adb', 'devices'], timeout=self.short_timeout)
+            result = self._run([self.executable, 'devices'], timeout=self.short_timeout)
             if result.returncode != 0:
                 logger.error("ADB command failed")
                 return False
@@ -36,25 +126,55 @@ class ADBClient:
             logger.error(f"ADB connection error: {e}")
             return False
 
-    def list_files(self, path: str) -> List[str]:
-        """Retrieve a list of all files in the given directory on the device."""
+    def _stream_shell(self, command: str) -> Iterator[str]:
+        """Yield the output of a device shell command line by line as it is produced."""
+        with subprocess.Popen([self.executable, 'shell', command], stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                              text=True, encoding='utf-8', bufsize=1, **SPAWN_OPTIONS) as proc:
+            for line in proc.stdout:
+                yield line.rstrip('\r\n')
+            stderr = proc.stderr.read()
+        if proc.returncode != 0:
+            logger.error(f"Shell command failed ({proc.returncode}): {stderr}")
+
+    def iter_files(self, path: str) -> Iterator[Tuple[str, int]]:
+        """
+        Stream every file in the given directory on the device as (path, byte size) pairs.
+        Raises ConnectionError once the stream ends if the listing did not run to completion.
+        """
+        # Sizes ride along in the same traversal so no per-file stat is needed later.
+        # The root is given without a trailing slash so paths never contain '//', and -H
+        # still descends into it when it is a symlink, as /sdcard is on most devices.
+        root = path.rstrip('/') or '/'
+        # find exits non-zero over any unreadable directory, so completion is marked by a trailer line instead
+        cmd = f'find -H "{root}" -type f -printf "%s\\t%p\\n" 2>/dev/null; echo {LISTING_TRAILER}'
+        complete = False
         try:
-            cmd = ['adb', 'shell', f'find "{path}" -type f 2>/dev/null | sort']
-            result = self._run(cmd, timeout=self.medium_timeout)
-            if result.returncode != 0:
-                logger.error(f"Failed to list files: {result.stderr}")
-                return []
-            
-            return [line.strip() for line in result.stdout.splitlines() if line.strip()]
+            for line in self._stream_shell(cmd):
+                if line == LISTING_TRAILER:
+                    complete = True
+                    continue
+                size, _, file_path = line.partition('\t')
+                if size.isdigit() and file_path:
+                    yield file_path, int(size)
         except Exception as e:
             logger.error(f"Error listing files: {e}")
-            return []
+        
+        if not complete:
+            raise ConnectionError(f"Listing of {root} ended before it completed")
+
+    def list_files(self, path: str) -> Dict[str, int]:
+        """Retrieve every file in the given directory on the device, mapped to its byte size."""
+        try:
+            return dict(self.iter_files(path))
+        except ConnectionError as e:
+            logger.error(str(e))
+            return {}
 
     def get_file_size(self, path: str) -> Optional[int]:
         """Obtain the precise byte size of a specified file on the device."""
         try:
-            cmd = ['adb', 'shell', f'stat -c %s "{path}"']
-            result = self._run(cmd, timeout=self.short_timeout)
+            cmd = f'stat -c %s "{path}"'
+            result = self._shell(cmd, timeout=self.short_timeout)
             if result.returncode == 0 and result.stdout.strip().isdigit():
                 return int(result.stdout.strip())
             return None
@@ -62,10 +182,121 @@ class ADBClient:
             logger.error(f"Error getting file size for {path}: {e}")
             return None
 
+    def get_file_hashes(self, paths: List[str]) -> Dict[str, str]:
+        """Compute the MD5 of many device files, batching as many paths per md5sum call as fit."""
+        hashes: Dict[str, str] = {}
+        batches = _chunk_arguments([shlex.quote(path) for path in paths])
+        
+        for batch in batches:
+            try:
+                result = self._shell(f"md5sum {' '.join(batch)} 2>/dev/null", timeout=self.long_timeout)
+                for line in result.stdout.splitlines():
+                    digest, _, file_path = line.partition('  ')
+                    if file_path:
+                        hashes[file_path] = digest.lower()
+            except Exception as e:
+                logger.error(f"Error hashing files: {e}")
+        
+        return hashes
+
+    def stream_tar(self, remote_dir: str) -> Optional[subprocess.Popen]:
+        """
+        Start archiving a device directory with tar. The returned process's stdout carries
+        the uncompressed archive, with member names relative to the directory.
+        """
+        try:
+            # exec-out keeps the stream binary-clean; the trailing slash lets tar enter a symlinked root
+            cmd = [self.executable, 'exec-out', f'tar -cf - -C "{remote_dir.rstrip("/")}/" . 2>/dev/null']
+            return subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, **SPAWN_OPTIONS)
+        except Exception as e:
+            logger.error(f"Error starting archive stream for {remote_dir}: {e}")
+            return None
+
+    def pull_batch(self, files: List[Tuple[str, str]]) -> Dict[str, bool]:
+        """
+        Download many small files over a single exec-out stream, avoiding a sync handshake
+        per file. Returns which device paths were written out in full.
+        """
+        delivered = {android_path: False for android_path, _ in files}
+        budget = MAX_SHELL_COMMAND - len(BATCH_SCRIPT)
+        quoted = [shlex.quote(android_path) for android_path, _ in files]
+        
+        start = 0
+        for chunk in _chunk_arguments(quoted, budget):
+            batch = files[start:start + len(chunk)]
+            start += len(chunk)
+            
+            cmd = [self.executable, 'exec-out', BATCH_SCRIPT.format(paths=' '.join(chunk))]
+            try:
+                with subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+                                      **SPAWN_OPTIONS) as proc:
+                    watchdog = threading.Timer(self.long_timeout, proc.kill)
+                    watchdog.start()
+                    try:
+                        self._read_batch(proc.stdout, batch, delivered)
+                    finally:
+                        watchdog.cancel()
+                        if proc.poll() is None:
+                            proc.kill()
+            except Exception as e:
+                logger.error(f"Error streaming file batch: {e}")
+        
+        return delivered
+
+    def _read_batch(self, stream, batch: List[Tuple[str, str]], delivered: Dict[str, bool]) -> None:
+        for android_path, local_path in batch:
+            header = stream.read(BATCH_HEADER_SIZE)
+            if len(header) != BATCH_HEADER_SIZE or not header.endswith(b'\n'):
+                # Framing lost (device gone or a file shrank mid-read); the rest fall back to pull_file
+                logger.error(f"File batch stream desynchronised at {android_path}")
+                return
+            size = int(header)
+            if size < 0:
+                continue
+            
+            # Each chunk fills the worker's fixed buffer before going to the kernel, so a file
+            # that fits is written in one call and a larger one never grows the buffer
+            buffer = _batch_buffer()
+            remaining = size
+            fd = os.open(local_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC | getattr(os, 'O_BINARY', 0), 0o666)
+            try:
+                while remaining:
+                    chunk = min(remaining, len(buffer))
+                    filled = 0
+                    while filled < chunk:
+                        count = stream.readinto(buffer[filled:chunk])
+                        if not count:
+                            break
+                        filled += count
+                    remaining -= filled
+                    view = buffer[:filled]
+                    while view:
+                        view = view[os.write(fd, view):]
+                    if filled < chunk:
+                        break
+            finally:
+                os.close(fd)
+            if remaining:
+                logger.error(f"File batch stream ended early at {android_path}")
+                _discard(local_path)
+                return
+            
+            status = stream.read(BATCH_STATUS_SIZE)
+            if len(status) != BATCH_STATUS_SIZE or not status[:-1].isdigit() or not status.endswith(b'\n'):
+                logger.error(f"File batch stream desynchronised after {android_path}")
+                _discard(local_path)
+                return
+            if int(status) != 0:
+                # The payload is padding or a partial read; the file falls back to pull_file
+                logger.error(f"Device could not read {android_path} in full (exit {int(status)})")
+                _discard(local_path)
+                continue
+            delivered[android_path] = True
+
     def pull_file(self, android_path: str, local_path: str) -> bool:
         """Download a file from the device to the local file system."""
         try:
-            cmd = ['adb', 'pull', android_path, local_path]
+            cmd = [self.executable, 'pull', android_path, local_path]
             result = self._run(cmd, timeout=self.long_timeout)
             
             if result.returncode != 0:
@@ -78,3 +309,127 @@ class ADBClient:
         except Exception as e:
             logger.error(f"Error pulling file {android_path}: {e}")
             return False
+
+    def pull_tree(self, remote_dir: str, local_dir: str) -> bool:
+        """Download an entire directory from the device into the given local parent directory."""
+        try:
+            # -a preserves timestamps so the tree mirrors what individual pulls would produce
+            cmd = [self.executable, 'pull', '-a', remote_dir, local_dir]
+            result = self._run(cmd, timeout=self.long_timeout)
+            
+            if result.returncode != 0:
+                logger.error(f"Failed to pull directory {remote_dir}: {result.stderr}")
+                return False
+            return True
+        except subprocess.TimeoutExpired:
+            logger.error(f"Pull command timed out for directory {remote_dir}")
+            return False
+        except Exception as e:
+            logger.error(f"Error pulling directory {remote_dir}: {e}")
+            return False
+
+
+class PythonADBClient(ADBClient):
+    """
+    Talks to the device over a single persistent USB transport using the adb_shell library,
+    avoiding an adb client process spawn for every command. The adb server must not be
+    holding the device (run 'adb kill-server' first).
+    """
+    
+    # adb_shell's shell streams are text-decoded, so archives can't pass through intact
+    supports_tar_stream = False
+    
+    def __init__(self, key_path: Optional[str] = None, short_timeout: int = 5,
+                 medium_timeout: int = 60, long_timeout: int = 300):
+        if AdbDeviceUsb is None:
+            raise ImportError("The adb_shell package is required: pip install adb-shell[usb]")
+        super().__init__(short_timeout, medium_timeout, long_timeout)
+        self.key_path = key_path or os.path.join(os.path.expanduser('~'), '.android', 'adbkey')
+        self._device: Optional[AdbDeviceUsb] = None
+
+    def connect(self) -> bool:
+        """Open the USB transport and authenticate with the host's adb key pair."""
+        try:
+            with open(self.key_path, 'r', encoding='utf-8') as f:
+                private_key = f.read()
+            with open(f"{self.key_path}.pub", 'r', encoding='utf-8') as f:
+                public_key = f.read()
+            
+            device = AdbDeviceUsb()
+            device.connect(rsa_keys=[PythonRSASigner(public_key, private_key)],
+                           auth_timeout_s=self.medium_timeout)
+            self._device = device
+            return True
+        except Exception as e:
+            logger.error(f"Failed to open persistent ADB transport: {e}")
+            self._device = None
+            return False
+
+    def close(self) -> None:
+        """Release the USB transport."""
+        if self._device is not None:
+            try: self._device.close()
+            except Exception: pass
+            self._device = None
+
+    def start_server(self) -> bool:
+        """No adb server is involved; starting one would claim the USB device from this transport."""
+        return True
+
+    def _shell(self, command: str, timeout: int) -> subprocess.CompletedProcess:
+        output = self._device.shell(command, timeout_s=timeout)
+        return subprocess.CompletedProcess(['shell', command], 0, stdout=output, stderr='')
+
+    def _stream_shell(self, command: str) -> Iterator[str]:
+        pending = ''
+        for chunk in self._device.streaming_shell(command):
+            pending += chunk
+            *lines, pending = pending.split('\n')
+            for line in lines:
+                yield line.rstrip('\r')
+        if pending:
+            yield pending.rstrip('\r')
+
+    def is_connected(self) -> bool:
+        """Check if the persistent transport is still usable."""
+        if self._device is None or not self._device.available:
+            logger.error("No ADB device connected")
+            return False
+        try:
+            self._shell('true', timeout=self.short_timeout)
+            return True
+        except Exception as e:
+            logger.error(f"ADB connection error: {e}")
+            return False
+
+    def pull_file(self, android_path: str, local_path: str) -> bool:
+        """Download a file from the device over the persistent transport."""
+        try:
+            self._device.pull(android_path, local_path, read_timeout_s=self.long_timeout)
+            return True
+        except Exception as e:
+            logger.error(f"Error pulling file {android_path}: {e}")
+            return False
+
+    def pull_batch(self, files: List[Tuple[str, str]]) -> Dict[str, bool]:
+        """The persistent transport has no per-file process cost, so files are simply pulled in turn."""
+        return {android_path: self.pull_file(android_path, local_path) for android_path, local_path in files}
+
+    def pull_tree(self, remote_dir: str, local_dir: str) -> bool:
+        """Download an entire directory by pulling each of its files over the same transport."""
+        files = self.list_files(remote_dir)
+        if not files:
+            return False
+        
+        target_root = os.path.join(local_dir, posixpath.basename(remote_dir.rstrip('/')))
+        success = True
+        for android_path in files:
+            local_path = os.path.normpath(os.path.join(target_root, posixpath.relpath(android_path, remote_dir)))
+            try:
+                os.makedirs(os.path.dirname(local_path), exist_ok=True)
+            except OSError as e:
+                logger.error(f"Failed to create directory for {local_path}: {e}")
+                success = False
+                continue
+            success = self.pull_file(android_path, local_path) and success
+        return success
@@ -1,28 +1,120 @@
 import os
+import posixpath
+import hashlib
 import logging
 import sys
 import msvcrt
+import queue
+import shutil
+import tarfile
 import threading
 import time
-from typing import List
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from typing import Deque, Dict, Iterable, List, Set, Tuple
 
+from concurrency import AdaptiveConcurrency
 from config import BackupConfig
 from adb import ADBClient
 from progress import ProgressTracker
+from scan import Entry, partition_entries
 
 logger = logging.getLogger("adb_backup")
 
+def _is_within(path: str, directory: str) -> bool:
+    return path == directory or path.startswith(directory.rstrip('/') + '/')
+
+def index_local_backup(root: str) -> Dict[str, int]:
+    """
+    Map every file under the backup root to its size in a single scandir walk, so
+    validating completed files does not cost an exists() and getsize() call each.
+    """
+    index: Dict[str, int] = {}
+    pending = [root.rstrip('/')]
+    
+    while pending:
+        directory = pending.pop()
+        try:
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    try:
+                        # Keys are built with '/' to match the orchestrator's local paths on every platform
+                        path = f"{directory}/{entry.name}"
+                        if entry.is_dir(follow_symlinks=False):
+                            pending.append(path)
+                        elif entry.is_file(follow_symlinks=False):
+                            index[path] = entry.stat(follow_symlinks=False).st_size
+                    except OSError as e:
+                        logger.error(f"Failed to index {entry.path}: {e}")
+        except OSError as e:
+            logger.error(f"Failed to index directory {directory}: {e}")
+    
+    return index
+
+def file_md5(path: str, chunk_size: int = 1 << 20) -> str:
+    """Hash a local file with MD5, the digest Android's toybox md5sum produces."""
+    digest = hashlib.md5()
+    with open(path, 'rb') as f:
+        while chunk := f.read(chunk_size):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+# How a unit of work is fetched: one adb pull per file, one recursive pull of a whole
+# directory, or many small files framed over a single exec-out stream. Verify units
+# hash files that are already backed up and re-pull only those that changed.
+PULL_FILE = "file"
+PULL_TREE = "tree"
+PULL_STREAM = "stream"
+PULL_VERIFY = "verify"
+
+# (mode, remote_dir, entries)
+Batch = Tuple[str, str, List[Entry]]
+
+@dataclass
+class DirectoryGroup:
+    """The files sitting directly inside one device directory."""
+    remote_dir: str
+    local_dir: str
+    entries: List[Entry] = field(default_factory=list)
+    # False once any file is found in a nested subdirectory
+    is_leaf: bool = True
+
 class ProgressBar:
     """A minimal, clean terminal progress bar."""
     
-    @staticmethod
-    def update(current: int, total: int, bar_length: int = 50) -> None:
+    # Redraws are capped at 10 Hz so fast small-file pulls don't turn into a stream of terminal writes
+    min_interval = 0.1
+    _last_render = 0.0
+    
+    @classmethod
+    def _due(cls, force: bool) -> bool:
+        now = time.monotonic()
+        if not force and now - cls._last_render < cls.min_interval:
+            return False
+        cls._last_render = now
+        return True
+    
+    @classmethod
+    def update(cls, current: int, total: int, bar_length: int = 50, force: bool = False) -> None:
+        if not cls._due(force):
+            return
+        
         progress = min(1.0, current / total) if total > 0 else 0
         arrow = '=' * int(round(progress * bar_length))
         spaces = ' ' * (bar_length - len(arrow))
         
         sys.stdout.write(f'\r[{arrow}{spaces}] {current}/{total} files ({int(progress * 100)}%)')
         sys.stdout.flush()
+    
+    @classmethod
+    def count(cls, current: int, force: bool = False) -> None:
+        """Running tally for transfers whose total isn't known up front."""
+        if not cls._due(force):
+            return
+        
+        sys.stdout.write(f'\r{current} files received')
+        sys.stdout.flush()
 
 class BackupOrchestrator:
     """Orchestrates the entire ADB backup lifecycle."""
@@ -33,6 +125,13 @@ class BackupOrchestrator:
         self.tracker = tracker
         self._pause_event = threading.Event()
         self._stop_event = threading.Event()
+        self._discovered = 0
+        self._listing_complete = False
+        self._tar_streamed = 0
+        self._session_start = 0.0
+        self._failure_streak = 0
+        self._concurrency = AdaptiveConcurrency(
+            config.pull_workers, config.pull_workers_min, config.pull_workers_max)
 
     def _keyboard_listener(self) -> None:
         """Daemon thread that continuously listens for the 'p' hotkey to toggle pause state."""
@@ -54,38 +153,136 @@ class BackupOrchestrator:
                     pass
             time.sleep(0.1) # Prevent CPU pegging
 
-    def _save_file_list(self, files: List[str]) -> None:
+    def _put(self, stage_queue: queue.Queue, item: object) -> None:
+        """Block on a bounded stage queue, giving up if the session is being torn down."""
+        while not self._stop_event.is_set():
+            try:
+                stage_queue.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                continue
+
+    def _get(self, stage_queue: queue.Queue) -> object:
+        while not self._stop_event.is_set():
+            try:
+                return stage_queue.get(timeout=0.1)
+            except queue.Empty:
+                continue
+        return None
+
+    def _list_stage(self, discovered: queue.Queue) -> None:
+        """
+        Pipeline stage 1: stream the device listing into the discovery queue, teeing
+        each path into the file list as it arrives so the listing is never held in memory.
+        """
         try:
-            with open(self.config.file_list, 'w', encoding='utf-8') as f:
-                for file_path in files:
-                    f.write(f"{file_path}\n")
+            file_list = open(self.config.file_list, 'w', encoding='utf-8')
         except Exception as e:
             logger.error(f"Error saving file list: {e}")
+            file_list = None
+        
+        try:
+            for path, size in self.client.iter_files(self.config.android_root):
+                if self._stop_event.is_set():
+                    break
+                if file_list is not None:
+                    file_list.write(f"{path}\n")
+                self._discovered += 1
+                self._put(discovered, (path, size))
+            else:
+                self._listing_complete = True
+        except Exception as e:
+            logger.error(f"Device listing aborted: {e}")
+        finally:
+            if file_list is not None:
+                file_list.close()
+            self._put(discovered, None)
+        
+        logger.info(f"Discovered {self._discovered} total targets")
 
-    def _create_directories(self, files: List[str]) -> None:
-        logger.info("Building local directory replication")
-        created_dirs = set()
+    def _directory_stage(self, discovered: queue.Queue, ready: queue.Queue) -> None:
+        """
+        Pipeline stage 2: replicate each directory locally as it is first seen and
+        hand complete per-directory groups to the dispatcher.
+        """
+        created_dirs: Dict[str, dict] = {}
+        created_count = 0
+        open_groups: List[DirectoryGroup] = []
+        # Local paths are plain concatenations off this root rather than a join/normpath per file
+        backup_root = self.config.local_backup_dir.rstrip('/')
         
-        for file_path in files:
-            rel_path = file_path.lstrip('/')
-            local_dir = os.path.normpath(os.path.join(self.config.local_backup_dir, os.path.dirname(rel_path)))
+        try:
+            while True:
+                item = self._get(discovered)
+                if item is None:
+                    break
+                path, size = item
+                remote_dir, _, name = path.rpartition('/')
+                
+                # The listing is depth-first, so a directory is complete once a path leaves its subtree
+                has_nested = False
+                while open_groups and not _is_within(remote_dir, open_groups[-1].remote_dir):
+                    closed = open_groups.pop()
+                    has_nested = has_nested or _is_within(closed.remote_dir, remote_dir)
+                    self._put(ready, closed)
+                
+                if not open_groups or open_groups[-1].remote_dir != remote_dir:
+                    if open_groups:
+                        open_groups[-1].is_leaf = False
+                    local_dir = f"{backup_root}/{remote_dir.removeprefix('/')}"
+                    open_groups.append(DirectoryGroup(remote_dir, local_dir, is_leaf=not has_nested))
+                    created_count += self._create_directory(remote_dir, created_dirs)
+                
+                group = open_groups[-1]
+                group.entries.append((path, f"{group.local_dir}/{name}", size))
             
-            if local_dir not in created_dirs:
+            while open_groups:
+                self._put(ready, open_groups.pop())
+        finally:
+            self._put(ready, None)
+        
+        logger.info(f"Replicated {created_count} directories")
+
+    def _create_directory(self, remote_dir: str, created_dirs: Dict[str, dict]) -> int:
+        """
+        Mirror a device directory under the backup root. created_dirs is a trie of path
+        components already on disk, so each directory is created with exactly one mkdir
+        instead of makedirs re-checking every ancestor. Returns the number created.
+        """
+        node = created_dirs
+        local_dir = self.config.local_backup_dir
+        created = 0
+        
+        for component in remote_dir.split('/'):
+            if not component:
+                continue
+            local_dir = os.path.join(local_dir, component)
+            child = node.get(component)
+            if child is None:
                 try:
-                    os.makedirs(local_dir, exist_ok=True)
-                    created_dirs.add(local_dir)
+                    os.mkdir(local_dir)
+                    created += 1
+                except FileExistsError:
+                    pass
                 except Exception as e:
                     logger.error(f"Failed to create directory {local_dir}: {e}")
-        
-        logger.info(f"Replicated {len(created_dirs)} directories")
+                    return created
+                child = node[component] = {}
+            node = child
+        return created
 
-    def _needs_backup(self, android_path: str, local_path: str) -> bool:
-        if self.tracker.is_completed(android_path) and os.path.exists(local_path):
+    def _needs_backup(self, android_path: str, local_path: str, device_size: int,
+                      local_index: Dict[str, int]) -> bool:
+        if self.tracker.is_completed(android_path):
             try:
-                local_size = os.path.getsize(local_path)
-                device_size = self.client.get_file_size(android_path)
+                local_size = local_index.get(local_path)
+                if local_size is None:
+                    # Not present when the index was built; it may still have landed since
+                    if not os.path.exists(local_path):
+                        return True
+                    local_size = os.path.getsize(local_path)
                 
-                if local_size == device_size and device_size is not None:
+                if local_size == device_size:
                     return False
                 
                 logger.info(f"Size mismatch: {android_path} (Local: {local_size}, Device: {device_size})")
@@ -96,43 +293,343 @@ class BackupOrchestrator:
                 
         return True
 
-    def run(self) -> None:
-        logger.info("Initializing backup agent.")
+    def _verify_batch(self, entries: List[Entry]) -> List[Tuple[str, str]]:
+        """
+        Compare the device-side MD5 of size-verified files against the digest recorded
+        when they were pulled, re-pulling those that no longer match. Files the device
+        returned no digest for (md5sum missing, failing or timing out) are kept as they are.
+        """
+        device_hashes = self.client.get_file_hashes([android_path for android_path, _, _ in entries])
         
-        if not self.client.is_connected():
-            logger.error("No active ADB connection found. Aborting.")
-            return
+        results = []
+        unverified = 0
+        for android_path, local_path, _ in entries:
+            expected = self.tracker.get_hash(android_path)
+            digest = device_hashes.get(android_path)
+            if digest is None:
+                unverified += 1
+            elif digest != expected:
+                logger.info(f"Hash mismatch: {android_path} (Recorded: {expected}, Device: {digest})")
+                try:
+                    os.remove(local_path)
+                    logger.info(f"Purged stale file payload: {local_path}")
+                except OSError as e:
+                    logger.error(f"File validation failure for {android_path}: {e}")
+                results.append(self._backup_one(android_path, local_path))
+                continue
+            results.append((android_path, "skipped"))
+        
+        if unverified:
+            logger.info(f"Kept {unverified} files unverified; the device returned no MD5 for them")
+        return results
 
-        os.makedirs(self.config.local_backup_dir, exist_ok=True)
+    def _record(self, android_path: str, local_path: str) -> None:
+        digest = None
+        if self.config.verify_hashes:
+            try:
+                digest = file_md5(local_path)
+            except OSError as e:
+                logger.error(f"Failed to hash {local_path}: {e}")
+        self.tracker.mark_completed(android_path, local_path, digest)
+
+    def _backup_one(self, android_path: str, local_path: str) -> Tuple[str, str]:
+        """Pull a single file on a worker thread and report its outcome."""
+        logger.debug(f"Pulling file: {android_path}")
+        if self.client.pull_file(android_path, local_path) and os.path.exists(local_path):
+            self._record(android_path, local_path)
+            return android_path, "success"
+
+        logger.error(f"Transmission failure: {android_path}")
+        if os.path.exists(local_path):
+            try: os.remove(local_path)
+            except OSError: pass
+        return android_path, "failed"
+
+    def _backup_tree(self, remote_dir: str, entries: List[Entry]) -> List[Tuple[str, str]]:
+        """Pull a whole directory in one transfer, then verify and record each pending file."""
+        logger.debug(f"Pulling directory: {remote_dir} ({len(entries)} pending files)")
+        local_parent = os.path.dirname(os.path.dirname(entries[0][1]))
+        pulled = self.client.pull_tree(remote_dir, local_parent)
         
-        android_files = self.client.list_files(self.config.android_root)
-        if not android_files:
-            logger.warning("No target files located on the device.")
-            return
+        results = []
+        for android_path, local_path, device_size in entries:
+            try:
+                intact = pulled and os.path.getsize(local_path) == device_size
+            except OSError:
+                intact = False
+            
+            if intact:
+                self._record(android_path, local_path)
+                results.append((android_path, "success"))
+            else:
+                # Whatever the tree pull missed is retried individually
+                results.append(self._backup_one(android_path, local_path))
+        return results
+
+    def _backup_stream(self, entries: List[Entry]) -> List[Tuple[str, str]]:
+        """Pull a run of small files over one framed stream, retrying any that miss individually."""
+        logger.debug(f"Streaming {len(entries)} small files")
+        delivered = self.client.pull_batch([(android_path, local_path) for android_path, local_path, _ in entries])
+        
+        results = []
+        for android_path, local_path, device_size in entries:
+            try:
+                intact = delivered.get(android_path, False) and os.path.getsize(local_path) == device_size
+            except OSError:
+                intact = False
+            
+            if intact:
+                self._record(android_path, local_path)
+                results.append((android_path, "success"))
+            else:
+                results.append(self._backup_one(android_path, local_path))
+        return results
 
-        self._save_file_list(android_files)
-        logger.info(f"Discovered {len(android_files)} total targets")
+    def _backup_batch(self, mode: str, remote_dir: str, entries: List[Entry]) -> List[Tuple[str, str]]:
+        if mode == PULL_TREE:
+            return self._backup_tree(remote_dir, entries)
+        if mode == PULL_STREAM:
+            return self._backup_stream(entries)
+        if mode == PULL_VERIFY:
+            return self._verify_batch(entries)
         
-        self._create_directories(android_files)
+        # Only pulls too large to stream feed the controller; they are dominated by payload rather
+        # than per-transfer overhead, so their rate is comparable whatever the file size
+        size = sum(entry[2] for entry in entries)
+        measured = size > self.config.stream_batch_max_bytes
+        concurrency = self._concurrency.begin() if measured else 0
+        started = time.monotonic()
+        try:
+            return [self._backup_one(android_path, local_path) for android_path, local_path, _ in entries]
+        finally:
+            if measured:
+                self._concurrency.record(time.monotonic() - started, size, concurrency)
+
+    def _plan_group(self, group: DirectoryGroup, local_index: Dict[str, int],
+                    stats: Dict[str, int]) -> List[Batch]:
+        """
+        Split a directory's pending files into units of work for the pull pool.
+        Leaf directories where most files still need copying are fetched with a single
+        directory pull; otherwise small files are grouped into framed streams of up to
+        stream_batch_max_bytes and everything larger is pulled file by file. With
+        verify_hashes, files that pass the size check go to the pool to be hashed there.
+        """
+        # The bulk of the split runs in one (optionally compiled) pass under a single lock hold;
+        # only files whose index entry disagrees go back to the disk
+        with self.tracker.view() as progress:
+            pending, intact, suspect = partition_entries(group.entries, progress, local_index)
+        for entry in suspect:
+            (pending if self._needs_backup(*entry, local_index) else intact).append(entry)
         
-        total = len(android_files)
-        stats = {"processed": 0, "success": 0, "skipped": 0, "failed": 0}
+        if self._tar_streamed:
+            # Files delivered by this session's archive stream were already counted
+            intact = [entry for entry in intact
+                      if (self.tracker.completed_at(entry[0]) or 0.0) < self._session_start]
         
-        logger.info(f"Commencing continuous backup of {total} targets")
-        print(f"Starting backup of {total} files...\n")
-        print("Press 'p' at any time to softly pause the backup.")
+        # Hashing runs on the device and can take minutes, so it is left to the pool rather than
+        # holding up dispatch. Files pulled before hashes were recorded keep the size-only verdict.
+        verify: List[Entry] = []
+        if intact and self.config.verify_hashes:
+            unhashed: List[Entry] = []
+            for entry in intact:
+                (verify if self.tracker.get_hash(entry[0]) else unhashed).append(entry)
+            intact = unhashed
+        stats["skipped"] += len(intact)
+        stats["processed"] += len(intact)
         
-        # Start keyboard listener daemon
-        listener_thread = threading.Thread(target=self._keyboard_listener, daemon=True)
-        listener_thread.start()
+        # A directory pull is recursive, so only directories without nested files qualify.
+        # It rewrites every file in the directory, which makes verifying any of them moot.
+        if (group.is_leaf
+                and len(pending) >= self.config.tree_pull_min_files
+                and len(pending) >= self.config.tree_pull_min_ratio * len(group.entries)):
+            return [(PULL_TREE, group.remote_dir, pending + verify)]
         
-        while stats["processed"] < total:
+        batches: List[Batch] = []
+        if verify:
+            batches.append((PULL_VERIFY, group.remote_dir, verify))
+        run: List[Entry] = []
+        run_bytes = 0
+        for entry in pending:
+            size = entry[2]
+            if size > self.config.stream_batch_max_bytes:
+                batches.append((PULL_FILE, group.remote_dir, [entry]))
+                continue
+            if run and run_bytes + size > self.config.stream_batch_max_bytes:
+                batches.append((PULL_STREAM if len(run) > 1 else PULL_FILE, group.remote_dir, run))
+                run, run_bytes = [], 0
+            run.append(entry)
+            run_bytes += size
+        if run:
+            batches.append((PULL_STREAM if len(run) > 1 else PULL_FILE, group.remote_dir, run))
+        return batches
+
+    def _collect(self, done: Iterable[Future], stats: Dict[str, int]) -> None:
+        for future in done:
+            if future.cancelled():
+                continue
+            for _, status in future.result():
+                stats[status] += 1
+                stats["processed"] += 1
+                self._failure_streak = self._failure_streak + 1 if status == "failed" else 0
+            self._show_progress(stats)
+
+    def _show_progress(self, stats: Dict[str, int], force: bool = False) -> None:
+        # The total keeps growing until the listing ends, and a tar stream has already counted
+        # files the listing has yet to reach, so only a running tally is honest until then
+        if self._listing_complete:
+            ProgressBar.update(stats["processed"], self._discovered, force=force)
+        else:
+            ProgressBar.count(stats["processed"], force=force)
+
+    @staticmethod
+    def _write_file(local_path: str, data: bytes, mtime: float) -> None:
+        with open(local_path, 'wb') as dst:
+            dst.write(data)
+        os.utime(local_path, (mtime, mtime))
+
+    def _record_streamed(self, android_path: str, local_path: str, stats: Dict[str, int]) -> None:
+        self._record(android_path, local_path)
+        stats["success"] += 1
+        stats["processed"] += 1
+        self._tar_streamed += 1
+
+    def _reap_writes(self, writes: Deque[Tuple[Future, str, str]], stats: Dict[str, int], depth: int) -> None:
+        """Record finished write-behind files in order, blocking while more than depth are outstanding."""
+        while writes and (len(writes) > depth or writes[0][0].done()):
+            future, android_path, local_path = writes.popleft()
             try:
-                # Obey pause flag nicely before we pull the next file from the array 
+                future.result()
+                self._record_streamed(android_path, local_path, stats)
+            except OSError as e:
+                logger.error(f"Failed to write {android_path} from archive stream: {e}")
+                if os.path.exists(local_path):
+                    try: os.remove(local_path)
+                    except OSError: pass
+
+    def _backup_via_tar(self, stats: Dict[str, int]) -> None:
+        """
+        Stream the whole tree through a single tar process on the device and unpack it
+        locally, recording each file as it lands. This removes the per-file transfer
+        handshake entirely; anything that fails to arrive is left to the per-file pipeline.
+        """
+        root = self.config.android_root.rstrip('/')
+        backup_root = self.config.local_backup_dir.rstrip('/')
+        
+        proc = self.client.stream_tar(root)
+        if proc is None:
+            return
+        
+        logger.info(f"Streaming {root} from the device as a single archive")
+        print("Streaming files from the device as a single archive...")
+        created_dir = None
+        # Small files are written behind the stream so the next member's USB read overlaps this one's disk write
+        writer = ThreadPoolExecutor(max_workers=1)
+        writes: Deque[Tuple[Future, str, str]] = deque()
+        
+        try:
+            with tarfile.open(fileobj=proc.stdout, mode='r|') as archive:
+                for member in archive:
+                    # A pause finishes the current file, then hands the remainder to the resumable pipeline
+                    if self._pause_event.is_set() or self._stop_event.is_set():
+                        break
+                    if not member.isfile():
+                        continue
+                    
+                    rel_path = posixpath.normpath(member.name)
+                    if rel_path.startswith('..') or posixpath.isabs(rel_path):
+                        logger.warning(f"Ignoring archive member outside the backup root: {member.name}")
+                        continue
+                    android_path = f"{root}/{rel_path}"
+                    local_path = f"{backup_root}/{android_path.removeprefix('/')}"
+                    
+                    try:
+                        local_dir = local_path.rpartition('/')[0]
+                        if local_dir != created_dir:
+                            os.makedirs(local_dir, exist_ok=True)
+                            created_dir = local_dir
+                        
+                        if member.size <= self.config.write_behind_max_bytes:
+                            with archive.extractfile(member) as src:
+                                data = src.read()
+                            writes.append((writer.submit(self._write_file, local_path, data, member.mtime),
+                                           android_path, local_path))
+                        else:
+                            with archive.extractfile(member) as src, open(local_path, 'wb') as dst:
+                                shutil.copyfileobj(src, dst, 1 << 20)
+                            os.utime(local_path, (member.mtime, member.mtime))
+                            self._record_streamed(android_path, local_path, stats)
+                    except (OSError, tarfile.TarError) as e:
+                        logger.error(f"Failed to unpack {android_path} from archive stream: {e}")
+                        if os.path.exists(local_path):
+                            try: os.remove(local_path)
+                            except OSError: pass
+                    
+                    self._reap_writes(writes, stats, self.config.write_queue_depth)
+                    ProgressBar.count(stats["processed"])
+        except (OSError, tarfile.TarError) as e:
+            logger.error(f"Archive stream ended unexpectedly: {e}")
+        finally:
+            if proc.poll() is None:
+                proc.kill()
+            proc.wait()
+            # Everything queued must be on disk before a pause declares the device safe to unplug
+            self._reap_writes(writes, stats, 0)
+            writer.shutdown()
+            ProgressBar.count(stats["processed"], force=True)
+            print()
+        
+        logger.info(f"Archive stream delivered {self._tar_streamed} files")
+
+    def _run_pipeline(self, stats: Dict[str, int]) -> bool:
+        """Run the listing, directory and pull stages. Returns False if the session halted early."""
+        # Listing, directory replication and pulling run as overlapping stages
+        discovered: queue.Queue = queue.Queue(maxsize=self.config.pipeline_queue_size)
+        ready: queue.Queue = queue.Queue(maxsize=self.config.pipeline_queue_size)
+        stages = [
+            threading.Thread(target=self._list_stage, args=(discovered,), daemon=True),
+            threading.Thread(target=self._directory_stage, args=(discovered, ready), daemon=True),
+        ]
+        for stage in stages:
+            stage.start()
+        
+        # Size up what is already on disk while the device is still being listed
+        local_index = index_local_backup(self.config.local_backup_dir)
+        logger.info(f"Indexed {len(local_index)} files already in the local backup")
+        
+        # The pool is sized for the ceiling; the adaptive limit decides how much of it is used
+        pool = ThreadPoolExecutor(max_workers=self.config.pull_workers_max)
+        limit = self._concurrency.limit
+        in_flight: Set[Future] = set()
+        batches: Deque[Batch] = deque()
+        listing_done = False
+        finished = False
+        
+        try:
+            while not (listing_done and not batches and not in_flight):
+                # Obey pause flag nicely before we hand out any more files
                 if self._pause_event.is_set():
-                    print("\n\nThe file that was in progress is now copied.")
-                    print("You can now successfully unplug your phone.")
-                    print("Press 'p' again to resume backup or Ctrl+C to abort.")
+                    # Let the transfers already in the pool land before declaring the device safe to unplug
+                    self._collect(wait(in_flight).done, stats)
+                    in_flight.clear()
+                    
+                    # The listing still reads from the device, so it has to finish before the phone is released.
+                    # Groups are planned as they arrive so the bounded stage queues keep draining meanwhile.
+                    if not listing_done:
+                        print("\n\nWaiting for the device listing to finish before pausing...")
+                    while not listing_done and self._pause_event.is_set() and not self._stop_event.is_set():
+                        try:
+                            group = ready.get(timeout=0.1)
+                        except queue.Empty:
+                            continue
+                        if group is None:
+                            listing_done = True
+                        else:
+                            batches.extend(self._plan_group(group, local_index, stats))
+                    
+                    if self._pause_event.is_set() and not self._stop_event.is_set():
+                        print("\n\nThe files that were in progress are now copied.")
+                        print("You can now successfully unplug your phone.")
+                        print("Press 'p' again to resume backup or Ctrl+C to abort.")
                     
                     # Spin-wait until the user presses 'p' again to clear the flag
                     while self._pause_event.is_set() and not self._stop_event.is_set():
@@ -141,49 +638,117 @@ class BackupOrchestrator:
                     if not self._stop_event.is_set():
                         print("\nResuming backup...")
                 
-                path = android_files[stats["processed"]]
-                rel_path = path.lstrip('/')
-                local_path = os.path.normpath(os.path.join(self.config.local_backup_dir, rel_path))
-                
-                # Revalidate health of device connection periodically
-                if stats["processed"] > 0 and stats["processed"] % 10 == 0:
+                # A disconnect surfaces as failing pulls, so only probe the device after a run of them
+                if self._failure_streak >= self.config.max_consecutive_failures:
+                    self._failure_streak = 0
                     if not self.client.is_connected():
                         logger.error("ADB connection severed during transmission. Halting.")
                         print("\nConnection lost to the device.")
                         break
                 
-                if not self._needs_backup(path, local_path):
-                    stats["skipped"] += 1
-                else:
-                    logger.debug(f"Pulling file: {path}")
-                    if self.client.pull_file(path, local_path) and os.path.exists(local_path):
-                        self.tracker.mark_completed(path, local_path)
-                        stats["success"] += 1
-                    else:
-                        logger.error(f"Transmission failure: {path}")
-                        if os.path.exists(local_path):
-                            try: os.remove(local_path)
-                            except OSError: pass
-                        stats["failed"] += 1
+                # Keep the pool saturated without queueing the whole backlog up front
+                while len(in_flight) < limit and not self._pause_event.is_set():
+                    if not batches:
+                        if listing_done:
+                            break
+                        try:
+                            group = ready.get(timeout=0.05)
+                        except queue.Empty:
+                            break
+                        if group is None:
+                            listing_done = True
+                            break
+                        batches.extend(self._plan_group(group, local_index, stats))
+                        self._show_progress(stats)
+                        continue
+                    
+                    in_flight.add(pool.submit(self._backup_batch, *batches.popleft()))
                 
-                stats["processed"] += 1
-                ProgressBar.update(stats["processed"], total)
+                backlogged = len(in_flight) >= limit and (bool(batches) or not ready.empty())
+                limit = self._concurrency.adjust(backlogged)
+                
+                if in_flight:
+                    done, in_flight = wait(in_flight, timeout=0.1, return_when=FIRST_COMPLETED)
+                    self._collect(done, stats)
+            else:
+                finished = True
                                 
-            except KeyboardInterrupt:
-                print("\n\nBackup fully aborted by user.")
-                logger.info("Process forcefully interrupted by the user")
-                break
-            except Exception as e:
-                print(f"\n\nAn unexpected anomaly occurred: {e}")
-                logger.error(f"Unhandled exception in backup loop: {e}", exc_info=True)
-                break
+        except KeyboardInterrupt:
+            print("\n\nBackup fully aborted by user.")
+            logger.info("Process forcefully interrupted by the user")
+        except Exception as e:
+            print(f"\n\nAn unexpected anomaly occurred: {e}")
+            logger.error(f"Unhandled exception in backup loop: {e}", exc_info=True)
+        finally:
+            # Abandon queued transfers but account for the ones already running
+            pool.shutdown(wait=True, cancel_futures=True)
+            self._collect(in_flight, stats)
+        
+        self._show_progress(stats, force=True)
+        
+        self._stop_event.set()
+        for stage in stages:
+            stage.join(timeout=1.0)
+        return finished
+
+    def run(self) -> bool:
+        """
+        Run a backup session. Returns False if it ended before every file on the device
+        was listed and dealt with: a broken listing, a lost connection, an error or an abort.
+        """
+        logger.info("Initializing backup agent.")
+        
+        # Start the server up front rather than inside whichever pull happens to run first
+        self.client.start_server()
+        
+        if not self.client.is_connected():
+            logger.error("No active ADB connection found. Aborting.")
+            return False
+
+        os.makedirs(self.config.local_backup_dir, exist_ok=True)
+        
+        stats = {"processed": 0, "success": 0, "skipped": 0, "failed": 0}
+        self._session_start = time.time()
+        
+        logger.info(f"Commencing continuous backup of {self.config.android_root}")
+        print(f"Starting backup of {self.config.android_root}...\n")
+        print("Press 'p' at any time to softly pause the backup.")
+        
+        # Start keyboard listener daemon
+        listener_thread = threading.Thread(target=self._keyboard_listener, daemon=True)
+        listener_thread.start()
+        
+        finished = False
+        try:
+            # A fresh backup has nothing to skip, so one archive stream beats any number of pulls
+            if self.config.tar_stream_fresh_backup and self.client.supports_tar_stream and len(self.tracker) == 0:
+                self._backup_via_tar(stats)
+            # The pipeline picks up whatever the stream missed, or everything on incremental runs
+            finished = self._run_pipeline(stats)
+        except KeyboardInterrupt:
+            print("\n\nBackup fully aborted by user.")
+            logger.info("Process forcefully interrupted by the user")
         
         # Cleanup
         self._stop_event.set()
         listener_thread.join(timeout=1.0)
+        
+        if self._discovered == 0:
+            logger.warning("No target files located on the device.")
             
         print("\n\n--- Session Summary ---")
         for metric, count in stats.items():
             print(f"{metric.capitalize():<12}: {count}")
             
+        if not self._listing_complete:
+            # Files the listing never reached are in neither the failure count nor the file list
+            print("\nIncomplete: the device listing was interrupted, so some files were never discovered.")
+            print("Run the backup again to pick them up.")
+            logger.warning(f"Session incomplete: device listing stopped after {self._discovered} files")
+        elif not finished:
+            print("\nIncomplete: the backup halted before every discovered file was dealt with.")
+            print("Run the backup again to pick up the rest.")
+            logger.warning(f"Session incomplete: halted after {stats['processed']} of {self._discovered} files")
+        
         logger.info(f"Backup session concluded. Telemetry: {stats}")
+        return self._listing_complete and finished
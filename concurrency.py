@@ -0,0 +1,113 @@
+import logging
+import threading
+import time
+from typing import Optional
+
+logger = logging.getLogger("adb_backup")
+
+class AdaptiveConcurrency:
+    """
+    Tunes how many pulls may be in flight at once.
+    The limit grows while the dispatcher has work queued behind it, and shrinks once the
+    combined throughput of the parallel pulls falls well below its recent best, which is
+    the symptom of too many ADB streams contending for the link.
+    """
+
+    def __init__(self, initial: int, minimum: int = 2, maximum: int = 16,
+                 interval: float = 5.0, starvation_delay: float = 0.5,
+                 degradation_ratio: float = 1.25, smoothing: float = 0.2,
+                 baseline_decay: float = 0.95, stale_intervals: int = 3):
+        self.minimum = minimum
+        self.maximum = maximum
+        self.interval = interval
+        self.starvation_delay = starvation_delay
+        self.degradation_ratio = degradation_ratio
+        self.smoothing = smoothing
+        self.baseline_decay = baseline_decay
+        self.stale_intervals = stale_intervals
+        self.limit = max(minimum, min(maximum, initial))
+
+        self._lock = threading.Lock()
+        self._throughput: Optional[float] = None
+        self._baseline: Optional[float] = None
+        # Pulls finished since the limit last changed that also started under the current limit
+        self._settled = 0
+        # Consecutive intervals the limit has been held waiting for such a pull, and how many
+        # measured pulls are still running that could end the wait
+        self._held = 0
+        self._pending = 0
+        self._backlogged_since: Optional[float] = None
+        self._last_adjustment = time.monotonic()
+
+    def begin(self) -> int:
+        """Note the start of a pull that will be passed to record. Returns the limit it runs under. Thread-safe."""
+        with self._lock:
+            self._pending += 1
+            return self.limit
+
+    def record(self, seconds: float, size: int, concurrency: int) -> None:
+        """
+        Fold a finished pull into the moving average of combined throughput, estimated as its
+        bytes per second times the number of pulls that were allowed alongside it. Thread-safe.
+        """
+        with self._lock:
+            self._pending -= 1
+        if seconds <= 0 or size <= 0:
+            return
+        sample = size / seconds * concurrency
+        with self._lock:
+            if self._throughput is None:
+                self._throughput = sample
+            else:
+                self._throughput += self.smoothing * (sample - self._throughput)
+            if concurrency == self.limit:
+                self._settled += 1
+
+    def adjust(self, backlogged: bool) -> int:
+        """
+        Called from the dispatcher loop; backlogged means work is waiting only because
+        the limit has been reached. Returns the limit to apply.
+        """
+        now = time.monotonic()
+        if not backlogged:
+            self._backlogged_since = None
+        elif self._backlogged_since is None:
+            self._backlogged_since = now
+
+        if now - self._last_adjustment < self.interval:
+            return self.limit
+        self._last_adjustment = now
+
+        with self._lock:
+            throughput, settled = self._throughput, self._settled
+            # Only large per-file pulls report, so once none are left running the last reading says
+            # nothing about the current mix; forget it and fall back to the backlog alone
+            if (throughput is not None and not settled and not self._pending
+                    and self._held >= self.stale_intervals):
+                self._throughput = self._baseline = throughput = None
+        degraded = False
+        if throughput is not None:
+            # Hold the limit until a pull started under it has finished, so changes don't outrun their evidence
+            if not settled:
+                self._held += 1
+                return self.limit
+            # The best rate fades each interval, so a burst of fast transfers can't condemn every later one
+            self._baseline = max(throughput, (self._baseline or 0.0) * self.baseline_decay)
+            degraded = throughput * self.degradation_ratio < self._baseline
+        self._held = 0
+        starved = self._backlogged_since is not None and now - self._backlogged_since >= self.starvation_delay
+
+        limit = self.limit
+        if degraded and limit > self.minimum:
+            limit -= 1
+            logger.info(f"Pull throughput degraded ({throughput / 1e6:.2f} MB/s vs {self._baseline / 1e6:.2f} MB/s); "
+                        f"concurrency -> {limit}")
+        if starved and not degraded and limit < self.maximum:
+            limit += 1
+            logger.info(f"Pull pool saturated; concurrency -> {limit}")
+
+        if limit != self.limit:
+            with self._lock:
+                self.limit = limit
+                self._settled = 0
+        return self.limit
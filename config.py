@@ -4,10 +4,50 @@ from dataclasses import dataclass
 class BackupConfig:
     """Configuration parameters for the backup process."""
     progress_file: str = "progress.json"
+    # Fold the progress journal into the snapshot after this many completions
+    checkpoint_interval: int = 100
     file_list: str = "file_list.txt"
     android_root: str = "/sdcard/"
     local_backup_dir: str = "android_backup"
     
+    # Number of concurrent 'adb pull' transfers to start with; the live value
+    # adapts to observed pull throughput within the min/max bounds
+    pull_workers: int = 8
+    pull_workers_min: int = 2
+    pull_workers_max: int = 16
+    
+    # Probe the device connection after this many pulls fail in a row
+    max_consecutive_failures: int = 3
+    
+    # Capacity of the queues between the listing, directory and pull stages
+    pipeline_queue_size: int = 1024
+    
+    # With no recorded progress, stream the whole tree through one on-device tar
+    # process before falling back to per-file pulls for anything it missed
+    tar_stream_fresh_backup: bool = True
+    
+    # Archive members up to this size are buffered and written on a background
+    # thread, with at most write_queue_depth files waiting to hit the disk
+    write_behind_max_bytes: int = 1 << 20
+    write_queue_depth: int = 32
+    
+    # Pull a whole leaf directory at once when it holds at least this many
+    # pending files and they make up at least this share of the directory
+    tree_pull_min_files: int = 16
+    tree_pull_min_ratio: float = 0.75
+    
+    # Record an MD5 of every pulled file and, on later runs, compare it with the
+    # device's md5sum so silently changed files are re-pulled even if the size matches
+    verify_hashes: bool = False
+    
+    # Files up to this size are fetched together over one framed exec-out stream,
+    # in batches totalling at most this many bytes
+    stream_batch_max_bytes: int = 1 << 20
+    
+    # Talk to the device over one persistent USB transport via the adb_shell
+    # package instead of spawning the adb executable for every command
+    use_python_adb: bool = False
+    
     # ADB command timeouts (in seconds)
     adb_timeout_short: int = 5
     adb_timeout_medium: int = 60
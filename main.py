@@ -4,7 +4,7 @@ import logging
 import sys
 
 from config import BackupConfig
-from adb import ADBClient
+from adb import ADBClient, PythonADBClient
 from progress import ProgressTracker
 from backup import BackupOrchestrator
 
@@ -41,17 +41,40 @@ def main() -> None:
     # 2. Inject dependencies
     config = BackupConfig()
     
-    client = ADBClient(
-        short_timeout=config.adb_timeout_short,
-        medium_timeout=config.adb_timeout_medium,
-        long_timeout=config.adb_timeout_long
-    )
+    client = None
+    if config.use_python_adb:
+        try:
+            client = PythonADBClient(
+                short_timeout=config.adb_timeout_short,
+                medium_timeout=config.adb_timeout_medium,
+                long_timeout=config.adb_timeout_long
+            )
+            if not client.connect():
+                client = None
+        except ImportError as e:
+            logger.warning(f"{e}; falling back to the adb executable")
     
-    tracker = ProgressTracker(config.progress_file)
+    if client is None:
+        client = ADBClient(
+            short_timeout=config.adb_timeout_short,
+            medium_timeout=config.adb_timeout_medium,
+            long_timeout=config.adb_timeout_long
+        )
+    
+    tracker = ProgressTracker(config.progress_file, config.checkpoint_interval)
     
     # 3. Mount and execute orchestrator
     orchestrator = BackupOrchestrator(config, client, tracker)
-    orchestrator.run()
+    try:
+        complete = orchestrator.run()
+    finally:
+        tracker.close()
+        if isinstance(client, PythonADBClient):
+            client.close()
+    
+    # A non-zero exit lets scheduled runs notice that the device was not fully backed up
+    if not complete:
+        sys.exit(1)
 
 if __name__ == "__main__":
     main()
@@ -1,49 +1,191 @@
 import json
 import os
 import logging
+import threading
 import time
-from typing import Dict, Any
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Any, Iterator, Optional
+
+try:
+    import orjson
+
+    def _dumps(obj: Any) -> bytes:
+        return orjson.dumps(obj)
+
+    # orjson.JSONDecodeError subclasses json.JSONDecodeError, so callers catch the stdlib type
+    _loads = orjson.loads
+except ImportError:
+    def _dumps(obj: Any) -> bytes:
+        return json.dumps(obj).encode('utf-8')
+
+    _loads = json.loads
 
 logger = logging.getLogger("adb_backup")
 
 class ProgressTracker:
-    """Manages the persistence and retrieval of backup state."""
-    
-    def __init__(self, progress_file: str):
+    """
+    Manages the persistence and retrieval of backup state.
+    Completions are appended to a JSONL journal as they happen, and the journal is
+    periodically folded into a compact JSON snapshot on a background thread.
+    """
+
+    def __init__(self, progress_file: str, checkpoint_interval: int = 100):
         self.progress_file = progress_file
+        self.journal_file = f"{os.path.splitext(progress_file)[0]}.jsonl"
+        self.checkpoint_interval = checkpoint_interval
+        self._lock = threading.Lock()
+        self._journal = None
+        self._journal_entries = 0
+        self._checkpoint_thread: Optional[threading.Thread] = None
         self._state: Dict[str, Any] = self._load()
 
+    @property
+    def _rotated_journal(self) -> str:
+        return f"{self.journal_file}.old"
+
     def _load(self) -> Dict[str, Any]:
-        """Safely load the existing progress from disk."""
-        if not os.path.exists(self.progress_file):
-            return {}
+        """Safely load the last snapshot from disk and replay any journaled completions on top."""
+        state: Dict[str, Any] = {}
+        if os.path.exists(self.progress_file):
+            try:
+                state = _loads(Path(self.progress_file).read_bytes())
+            except json.JSONDecodeError:
+                logger.warning("Progress file is corrupted; starting fresh")
+            except Exception as e:
+                logger.error(f"Failed to load progress file: {e}")
+
+        # The rotated journal holds entries from a checkpoint that never finished
+        for journal in (self._rotated_journal, self.journal_file):
+            if os.path.exists(journal):
+                self._replay(journal, state)
+        return state
+
+    def _replay(self, journal: str, state: Dict[str, Any]) -> None:
         try:
-            with open(self.progress_file, 'r', encoding='utf-8') as f:
-                return json.load(f)
-        except json.JSONDecodeError:
-            logger.warning("Progress file is corrupted; starting fresh")
-            return {}
+            with open(journal, 'rb') as f:
+                for line in f:
+                    try:
+                        record = _loads(line)
+                    except json.JSONDecodeError:
+                        # A crash mid-append leaves a torn final line; everything before it is intact
+                        logger.warning(f"Skipping unreadable progress journal entry in {journal}")
+                        continue
+                    state[record["path"]] = self._entry(record["ts"], record["local"], record.get("md5"))
         except Exception as e:
-            logger.error(f"Failed to load progress file: {e}")
-            return {}
+            logger.error(f"Failed to replay progress journal {journal}: {e}")
 
-    def save(self) -> None:
-        """Persist the current tracking state to disk."""
+    def _write_snapshot(self, state: Dict[str, Any]) -> bool:
+        temp_file = f"{self.progress_file}.tmp"
         try:
-            with open(self.progress_file, 'w', encoding='utf-8') as f:
-                json.dump(self._state, f)
+            Path(temp_file).write_bytes(_dumps(state))
+            os.replace(temp_file, self.progress_file)
+            return True
         except Exception as e:
             logger.error(f"Failed to save progress file: {e}")
+            return False
 
-    def is_completed(self, android_path: str) -> bool:
-        """Check if a particular file has already been successfully backed up."""
-        return self._state.get(android_path, {}).get("completed", False)
+    def _checkpoint(self, state: Dict[str, Any]) -> None:
+        if self._write_snapshot(state):
+            try: os.remove(self._rotated_journal)
+            except OSError: pass
 
-    def mark_completed(self, android_path: str, local_path: str) -> None:
-        """Record a file as successfully copied."""
-        self._state[android_path] = {
+    def _rotate_journal(self) -> None:
+        """Move the live journal aside so a snapshot can absorb it. Caller must hold the lock."""
+        if self._journal is not None:
+            self._journal.close()
+            self._journal = None
+        self._journal_entries = 0
+
+        if not os.path.exists(self.journal_file):
+            return
+        if os.path.exists(self._rotated_journal):
+            # A previous checkpoint failed; keep its entries alongside the new ones
+            with open(self.journal_file, 'rb') as src, open(self._rotated_journal, 'ab') as dst:
+                dst.write(src.read())
+            os.remove(self.journal_file)
+        else:
+            os.replace(self.journal_file, self._rotated_journal)
+
+    def save(self) -> None:
+        """Persist the current tracking state to disk as a compacted snapshot."""
+        with self._lock:
+            # Background checkpoints never take the lock, so waiting on one here is safe
+            if self._checkpoint_thread is not None:
+                self._checkpoint_thread.join()
+            try:
+                self._rotate_journal()
+            except Exception as e:
+                logger.error(f"Failed to rotate progress journal: {e}")
+                return
+            self._checkpoint(dict(self._state))
+
+    def close(self) -> None:
+        """Fold the journal into the snapshot and release the journal handle."""
+        self.save()
+
+    @staticmethod
+    def _entry(timestamp: float, local_path: str, md5: Optional[str]) -> Dict[str, Any]:
+        entry = {
             "completed": True,
-            "timestamp": time.time(),
+            "timestamp": timestamp,
             "local_path": local_path
         }
-        self.save()
+        if md5:
+            entry["md5"] = md5
+        return entry
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._state)
+
+    @contextmanager
+    def view(self) -> Iterator[Dict[str, Any]]:
+        """Expose the raw state for a bulk read-only scan while holding the lock."""
+        with self._lock:
+            yield self._state
+
+    def is_completed(self, android_path: str) -> bool:
+        """Check if a particular file has already been successfully backed up."""
+        with self._lock:
+            return self._state.get(android_path, {}).get("completed", False)
+
+    def completed_at(self, android_path: str) -> Optional[float]:
+        """Return when the file was recorded as backed up, if it has been."""
+        with self._lock:
+            return self._state.get(android_path, {}).get("timestamp")
+
+    def get_hash(self, android_path: str) -> Optional[str]:
+        """Return the MD5 recorded when the file was pulled, if one was taken."""
+        with self._lock:
+            return self._state.get(android_path, {}).get("md5")
+
+    def mark_completed(self, android_path: str, local_path: str, md5: Optional[str] = None) -> None:
+        """Record a file as successfully copied, optionally with the digest of the local copy."""
+        timestamp = time.time()
+        record = {"path": android_path, "ts": timestamp, "local": local_path}
+        if md5:
+            record["md5"] = md5
+        with self._lock:
+            self._state[android_path] = self._entry(timestamp, local_path, md5)
+            try:
+                if self._journal is None:
+                    self._journal = open(self.journal_file, 'ab')
+                    # Start on a fresh line if a crash left a torn entry at the end
+                    if self._journal.tell() > 0:
+                        with open(self.journal_file, 'rb') as f:
+                            f.seek(-1, os.SEEK_END)
+                            if f.read(1) != b"\n":
+                                self._journal.write(b"\n")
+                self._journal.write(_dumps(record) + b"\n")
+                self._journal.flush()
+                self._journal_entries += 1
+
+                if (self._journal_entries >= self.checkpoint_interval
+                        and (self._checkpoint_thread is None or not self._checkpoint_thread.is_alive())):
+                    self._rotate_journal()
+                    self._checkpoint_thread = threading.Thread(
+                        target=self._checkpoint, args=(dict(self._state),), daemon=True)
+                    self._checkpoint_thread.start()
+            except Exception as e:
+                logger.error(f"Failed to record progress: {e}")
@@ -0,0 +1,35 @@
+from typing import Any, Dict, List, Tuple
+
+# (android_path, local_path, device_size)
+Entry = Tuple[str, str, int]
+
+def _partition_entries(entries: List[Entry], progress: Dict[str, Any],
+                       local_index: Dict[str, int]) -> Tuple[List[Entry], List[Entry], List[Entry]]:
+    """
+    Split a directory's entries for the skip check, returning (pending, intact, suspect):
+    files never completed, completed files whose indexed local size matches the device,
+    and completed files that need a closer look on disk.
+    """
+    pending: List[Entry] = []
+    intact: List[Entry] = []
+    suspect: List[Entry] = []
+
+    for entry in entries:
+        record = progress.get(entry[0])
+        if record is None or not record.get("completed", False):
+            pending.append(entry)
+            continue
+
+        local_size = local_index.get(entry[1])
+        if local_size is not None and local_size == entry[2]:
+            intact.append(entry)
+        else:
+            suspect.append(entry)
+
+    return pending, intact, suspect
+
+# Prefer the Cython build of the same loop (python setup.py build_ext --inplace)
+try:
+    from _scan import partition_entries
+except ImportError:
+    partition_entries = _partition_entries
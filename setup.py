@@ -0,0 +1,8 @@
+"""Builds the optional compiled skip-check loop: python setup.py build_ext --inplace"""
+from setuptools import setup
+from Cython.Build import cythonize
+
+setup(
+    name="adb-backup-scripts",
+    ext_modules=cythonize("_scan.pyx", language_level=3),
+)
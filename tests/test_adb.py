@@ -0,0 +1,68 @@
+import io
+import os
+import tempfile
+import unittest
+
+from adb import ADBClient
+
+def record(payload: bytes, status: int = 0) -> bytes:
+    """Frame one file the way BATCH_SCRIPT emits it."""
+    return b"%010d\n" % len(payload) + payload + b"%03d\n" % status
+
+class ReadBatchTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.client = ADBClient(executable='adb')
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def _read(self, stream: bytes, names):
+        batch = [(f"/sdcard/{name}", os.path.join(self.tmp.name, name)) for name in names]
+        delivered = {android_path: False for android_path, _ in batch}
+        self.client._read_batch(io.BytesIO(stream), batch, delivered)
+        return delivered
+
+    def _local(self, name: str) -> bytes:
+        with open(os.path.join(self.tmp.name, name), 'rb') as f:
+            return f.read()
+
+    def test_unreadable_record_is_discarded_without_desynchronising(self):
+        # The middle file stat'ed but couldn't be read, so its payload is padding
+        stream = record(b"first") + record(b"\0" * 300, status=1) + record(b"third")
+        delivered = self._read(stream, ["a", "b", "c"])
+
+        self.assertEqual(delivered, {"/sdcard/a": True, "/sdcard/b": False, "/sdcard/c": True})
+        self.assertEqual(self._local("a"), b"first")
+        self.assertEqual(self._local("c"), b"third")
+        self.assertFalse(os.path.exists(os.path.join(self.tmp.name, "b")))
+
+    @unittest.skipIf(os.name == 'nt', "POSIX permission bits")
+    def test_written_files_are_not_executable(self):
+        self._read(record(b"first"), ["a"])
+
+        mode = os.stat(os.path.join(self.tmp.name, "a")).st_mode
+        self.assertFalse(mode & 0o111)
+
+    def test_missing_file_has_no_payload(self):
+        stream = b"%010d\n" % -1 + record(b"second")
+        delivered = self._read(stream, ["a", "b"])
+
+        self.assertEqual(delivered, {"/sdcard/a": False, "/sdcard/b": True})
+        self.assertEqual(self._local("b"), b"second")
+
+    def test_truncated_stream_stops_delivery(self):
+        stream = record(b"first") + record(b"second")[:-6]
+        delivered = self._read(stream, ["a", "b"])
+
+        self.assertEqual(delivered, {"/sdcard/a": True, "/sdcard/b": False})
+
+    def test_record_without_status_is_not_delivered(self):
+        stream = b"%010d\n" % 5 + b"first"
+        delivered = self._read(stream, ["a"])
+
+        self.assertEqual(delivered, {"/sdcard/a": False})
+        self.assertFalse(os.path.exists(os.path.join(self.tmp.name, "a")))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,78 @@
+import os
+import queue
+import sys
+import tempfile
+import types
+import unittest
+
+# backup.py reads the pause hotkey through msvcrt, which only exists on Windows;
+# the keyboard listener is never started here
+sys.modules.setdefault('msvcrt', types.SimpleNamespace(kbhit=lambda: False, getch=lambda: b''))
+
+from backup import BackupOrchestrator
+from config import BackupConfig
+
+class DirectoryStageTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = self.tmp.name.replace(os.sep, '/')
+        config = BackupConfig(local_backup_dir=self.root)
+        self.orchestrator = BackupOrchestrator(config, client=None, tracker=None)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def _groups(self, paths):
+        """Run a listing through the directory stage and return (dir, file names, is_leaf) per group."""
+        discovered: queue.Queue = queue.Queue()
+        ready: queue.Queue = queue.Queue()
+        for path in paths:
+            discovered.put((path, 1))
+        discovered.put(None)
+
+        self.orchestrator._directory_stage(discovered, ready)
+
+        groups = []
+        while (group := ready.get_nowait()) is not None:
+            names = [android_path.rpartition('/')[2] for android_path, _, _ in group.entries]
+            groups.append((group.remote_dir, names, group.is_leaf))
+        return groups
+
+    def test_directory_revisited_after_a_subdirectory(self):
+        groups = self._groups(["/sdcard/A/a1", "/sdcard/A/B/b1", "/sdcard/A/a2"])
+
+        self.assertEqual(groups, [
+            ("/sdcard/A/B", ["b1"], True),
+            ("/sdcard/A", ["a1", "a2"], False),
+        ])
+
+    def test_parent_first_seen_after_a_nested_directory(self):
+        groups = self._groups(["/sdcard/A/B/C/c1", "/sdcard/A/a1"])
+
+        self.assertEqual(groups, [
+            ("/sdcard/A/B/C", ["c1"], True),
+            ("/sdcard/A", ["a1"], False),
+        ])
+
+    def test_sibling_sharing_a_name_prefix_is_not_nested(self):
+        groups = self._groups(["/sdcard/DCIM/x", "/sdcard/DCIM2/y"])
+
+        self.assertEqual(groups, [
+            ("/sdcard/DCIM", ["x"], True),
+            ("/sdcard/DCIM2", ["y"], True),
+        ])
+
+    def test_entries_map_into_the_backup_root(self):
+        discovered: queue.Queue = queue.Queue()
+        ready: queue.Queue = queue.Queue()
+        discovered.put(("/sdcard/A/B/b1", 7))
+        discovered.put(None)
+
+        self.orchestrator._directory_stage(discovered, ready)
+
+        group = ready.get_nowait()
+        self.assertEqual(group.entries, [("/sdcard/A/B/b1", f"{self.root}/sdcard/A/B/b1", 7)])
+        self.assertTrue(os.path.isdir(os.path.join(self.tmp.name, "sdcard", "A", "B")))
+
+if __name__ == '__main__':
+    unittest.main()